@@ -1,30 +1,40 @@
 from http.server import SimpleHTTPRequestHandler, HTTPServer
-from urllib import parse
 import re
 import numpy as np
 import pickle
-import csv
 import threading
 import time
-import os
-
-# List of suspicious keywords - SQL injection and XSS patterns
-badwords = [
-    # SQL Injection keywords
-    'select', 'union', 'or', 'and', 'where', 'from', 'insert', 'update', 'delete',
-    'drop', 'table', 'database', 'exec', 'execute', 'script', 'waitfor', 'delay',
-    'sleep', 'order by', 'group by', 'having', 'join', 'inner join', 'outer join',
-    # XSS and Scripting
-    'script', '<script', '</script>', 'javascript:', 'onerror', 'onclick', 'onload',
-    'alert', 'eval', 'document.cookie', 'document.write',
-    # Other suspicious patterns
-    'admin', 'uid', 'password', 'passwd', 'root', 'system', 'cmd', 'command',
-    'shell', 'phpinfo', 'base64', 'char(', 'ascii('
-]
+import random
+import ipaddress
+from features import ExtractFeatures, badwords
+from heuristics import (SQL_PATTERNS, XSS_PATTERNS, RCE_PATTERNS, FILE_INCLUSION_PATTERNS, SSRF_PATTERNS,
+                        IDOR_HINTS, find_matches, flagged)
+from sample_store import SampleStore
+from reputation import ReputationTable, DEFAULT_PATH as REPUTATION_PATH
+from route_index import RouteIndex
+from dataset_store import iter_collection_csv
 
 MODEL_PATH = 'training_model.pkl'
+# Legacy append-only corpus, only read once to seed the sample store
 MALICIOUS_CSV = 'malicious_payloads.csv'
 BENIGN_CSV = 'benign_payloads.csv'
+# Bounded, deduplicated self-training corpus
+MALICIOUS_SAMPLES_CSV = 'malicious_samples.csv'
+BENIGN_SAMPLES_CSV = 'benign_samples.csv'
+SAMPLES_PER_CLASS = 5000
+# Clean sources skip the ML model, but about 1 in N of their requests
+# (chosen at random) is still fully inspected
+CLEAN_RECHECK_EVERY = 10
+# Peers allowed to report the real client address in CLIENT_IP_HEADER (e.g.
+# a reverse proxy you run in front of the WAF). Empty by default: the header
+# is client-controlled unless a trusted proxy sets it, and reputation entries
+# drive network-layer blocks. Without it every client is the loopback peer,
+# which the reputation table never tracks.
+TRUSTED_PROXIES = set()
+CLIENT_IP_HEADER = 'X-Forwarded-For'
+# Known-good traffic the route index is learned from (plus benign samples)
+GOOD_REQ_CSV = 'Data_Collection/Good_req.csv'
+ROUTE_REFRESH_SECONDS = 300
 
 # Load trained model once
 with open(MODEL_PATH, 'rb') as f:
@@ -36,71 +46,6 @@ with open(MODEL_PATH, 'rb') as f:
 # so no vectorizer needed; you can retrain directly on features.
 # We'll add a simple retrain function below.
 
-def ExtractFeatures(path, body):
-    path = str(path)
-    body = str(body)
-    combined_raw = path + body
-    raw_percentages = combined_raw.count("%")
-    raw_spaces = combined_raw.count(" ")
-
-    raw_percentages_count = raw_percentages if raw_percentages > 3 else 0
-    raw_spaces_count = raw_spaces if raw_spaces > 3 else 0
-
-    path_decoded = parse.unquote_plus(path)
-    body_decoded = parse.unquote_plus(body)
-
-    single_q = path_decoded.count("'") + body_decoded.count("'")
-    double_q = path_decoded.count('"') + body_decoded.count('"')
-    dashes = path_decoded.count("--") + body_decoded.count("--")
-    braces = path_decoded.count("(") + body_decoded.count("(")
-    spaces = path_decoded.count(" ") + body_decoded.count(" ")
-    semicolons = path_decoded.count(";") + body_decoded.count(";")
-    angle_brackets = path_decoded.count("<") + path_decoded.count(">") + body_decoded.count("<") + body_decoded.count(">")
-    special_chars = sum(path_decoded.count(c) + body_decoded.count(c) for c in '$&|')
-    badwords_count = sum(path_decoded.lower().count(word) + body_decoded.lower().count(word) for word in badwords)
-    path_length = len(path_decoded)
-    body_length = len(body_decoded)
-
-    return [single_q, double_q, dashes, braces, spaces, raw_percentages_count,
-            semicolons, angle_brackets, special_chars, path_length, body_length, badwords_count]
-
-# --------------------- Heuristic detectors ---------------------
-SQL_PATTERNS = [
-    r"(?i)\bunion\s+select\b",
-    r"(?i)'\s*or\s*'1'='1",
-    r"(?i)or\s+1=1",
-    r"(?i)order\s+by\s+\d+",
-    r"(?i);?\s*drop\s+table",
-]
-XSS_PATTERNS = [
-    r"(?i)<script[^>]*>",
-    r"(?i)javascript:\s*",
-    r"(?i)onerror\s*=",
-    r"(?i)onload\s*=",
-]
-RCE_PATTERNS = [
-    r"(?i)(;|&&|\|\|)\s*(sh|bash|cmd|powershell)\b",
-    r"(?i)\b(system|exec|popen|passthru)\s*\(",
-]
-FILE_INCLUSION_PATTERNS = [
-    r"(?i)(\.|\/){2,}",            # ../ traversal
-    r"(?i)\b(file|php|data|zip|expect)://",
-]
-SSRF_PATTERNS = [
-    r"(?i)\b(127\.0\.0\.1|0\.0\.0\.0|169\.254\.|localhost|\[::1\])\b",
-    r"(?i)\bhttp(s)?://metadata/",
-]
-IDOR_HINTS = [
-    r"(?i)\b(user|account|id|uid)=\d{3,}\b",
-]
-
-def find_matches(text: str, patterns):
-    hits = []
-    for p in patterns:
-        if re.search(p, text):
-            hits.append(p)
-    return hits
-
 def parse_body(content_type: str, raw: bytes) -> str:
     try:
         text = raw.decode('utf-8', errors='ignore')
@@ -118,74 +63,156 @@ def parse_body(content_type: str, raw: bytes) -> str:
     # x-www-form-urlencoded or others: return as-is
     return text
 
-def append_payload_to_csv(file_path, path, body):
-    features = ExtractFeatures(path, body)
-    with open(file_path, 'a', newline='', encoding='utf-8') as csvfile:
-        writer = csv.writer(csvfile)
-        # Store the raw path and body, plus features as backup
-        writer.writerow([path, body] + features)
-
-# Function to load data from CSV and prepare for retraining
-def load_data_from_csv(file_path, label):
-    data = []
-    labels = []
-    if not os.path.exists(file_path):
-        return data, labels
-    with open(file_path, 'r', encoding='utf-8') as f:
-        reader = csv.reader(f)
-        for row in reader:
-            if len(row) < 2:
-                continue
-            path = row[0]
-            body = row[1]
-            features = ExtractFeatures(path, body)
-            data.append(features)
-            labels.append(label)
-    return data, labels
-
-# Retrain function - retrains model using all data in CSVs
+sample_store = SampleStore(BENIGN_SAMPLES_CSV, MALICIOUS_SAMPLES_CSV, capacity=SAMPLES_PER_CLASS)
+
+
+def init_sample_store():
+    if sample_store.load():
+        counts = sample_store.counts()
+        print(f"[SAMPLES] Loaded {counts[0]} benign / {counts[1]} malicious samples")
+        return
+    imported = sample_store.seed_from_csv(BENIGN_CSV, 0) + sample_store.seed_from_csv(MALICIOUS_CSV, 1)
+    if imported:
+        counts = sample_store.counts()
+        sample_store.save()
+        print(f"[SAMPLES] Seeded from {imported} legacy payload rows "
+              f"({counts[0]} benign / {counts[1]} malicious unique)")
+
+# Retrain function - retrains model on the deduplicated sample store
 def retrain_model():
     global model
     while True:
         time.sleep(60)  # retrain every 60 seconds
 
-        benign_data, benign_labels = load_data_from_csv(BENIGN_CSV, 0)
-        malicious_data, malicious_labels = load_data_from_csv(MALICIOUS_CSV, 1)
-
-        X = benign_data + malicious_data
-        y = benign_labels + malicious_labels
+        sample_store.save()
+        samples = sample_store.samples()
 
-        if not X:
+        if not samples:
             print("No data available for retraining.")
             continue
 
-        X_np = np.array(X)
-        y_np = np.array(y)
+        X_np = np.array([ExtractFeatures(path, body) for path, body, _, _ in samples])
+        y_np = np.array([label for _, _, label, _ in samples])
+        # Occurrence counts as weights, log-scaled so a flood of one
+        # identical request cannot drown out everything else
+        w_np = 1.0 + np.log(np.array([count for _, _, _, count in samples], dtype=float))
+        n_malicious = int(y_np.sum())
 
         try:
             # For scikit-learn models that support partial_fit:
             if hasattr(model, 'partial_fit'):
-                model.partial_fit(X_np, y_np)
+                model.partial_fit(X_np, y_np, sample_weight=w_np)
             else:
                 # If no partial_fit, fully retrain (assuming model supports fit)
-                model.fit(X_np, y_np)
+                model.fit(X_np, y_np, sample_weight=w_np)
 
             # Save updated model
             with open(MODEL_PATH, 'wb') as f:
                 pickle.dump(model, f)
 
-            print(f"[RETRAIN] Model retrained with {len(X)} samples "
-                  f"(Benign: {len(benign_data)}, Malicious: {len(malicious_data)})")
+            print(f"[RETRAIN] Model retrained with {len(samples)} unique samples "
+                  f"(Benign: {len(samples) - n_malicious}, Malicious: {n_malicious})")
 
         except Exception as e:
             print(f"Error during retrain: {e}")
 
+# Positive-security route index; rebuilt in the background and swapped in whole
+route_index = None
+
+
+def build_route_index():
+    global route_index
+    requests = [(path, body) for path, body, label, _ in sample_store.samples() if label == 0]
+    try:
+        requests += [(path, body) for path, body, label in iter_collection_csv(GOOD_REQ_CSV) if label == 0]
+    except OSError:
+        pass
+    route_index = RouteIndex.build(requests)
+    print(f"[ROUTES] Learned {len(route_index)} routes from {route_index.samples} benign samples")
+
+
+def refresh_route_index():
+    while True:
+        time.sleep(ROUTE_REFRESH_SECONDS)
+        try:
+            build_route_index()
+        except Exception as e:
+            print(f"Error during route index refresh: {e}")
+
+# Reputation table shared with the network firewall (network_firewall.py)
+try:
+    reputation = ReputationTable(REPUTATION_PATH)
+except (OSError, ValueError) as e:
+    print(f"[REPUTATION] Shared table unavailable ({e}), inspecting every request")
+    reputation = None
+
 class WAFServer(SimpleHTTPRequestHandler):
 
+    def client_ip(self):
+        """Client address, taken from CLIENT_IP_HEADER when the peer is a trusted proxy"""
+        peer = self.client_address[0]
+        forwarded = self.headers.get(CLIENT_IP_HEADER) if peer in TRUSTED_PROXIES else None
+        if forwarded:
+            # The rightmost entry is the one appended by the trusted proxy
+            try:
+                return str(ipaddress.ip_address(forwarded.split(',')[-1].strip()))
+            except ValueError:
+                pass
+        return peer
+
+    def reputation_fast_path(self, path, body, tag):
+        """Answer from the shared reputation table; returns True if the request was handled"""
+        if not reputation:
+            return False
+        client_ip = self.client_ip()
+
+        if reputation.is_blocked(client_ip):
+            self.send_response(403, "Forbidden")
+            self.send_header("Content-type", "text/plain")
+            self.end_headers()
+            self.wfile.write(b"Malicious request detected!\nReason: Reputation: convicted source")
+            print(f"[BLOCKED{tag}] {client_ip} {path}")
+            print("  └─ Reason: Reputation: convicted source")
+            return True
+
+        # Clean sources skip only the ML model; the cheap checks always run and
+        # a random sample is fully inspected. Only inspected requests extend
+        # the clean streak, so a source cannot predict or farm its rechecks.
+        if (reputation.clean_streak(client_ip)
+                and random.random() >= 1.0 / CLEAN_RECHECK_EVERY
+                and not flagged(path, body)):
+            self.send_passed()
+            print(f"[PASSED{tag}] {client_ip} {path} (Reputation: clean)")
+            return True
+
+        return False
+
+    def route_fast_path(self, path, body, tag):
+        """Pass requests that fully conform to a learned route; returns True if handled"""
+        index = route_index
+        # conforms() also rejects anything the badword/regex checks flag;
+        # only the ML model is skipped. Passes are not recorded as benign
+        # samples: they were never inspected and must not feed the corpus
+        # the index and the model are learned from.
+        if index is None or not index.conforms(path, body):
+            return False
+        self.send_passed()
+        print(f"[PASSED{tag}] {self.client_ip()} {path} (Route profile)")
+        return True
+
+    def send_passed(self):
+        self.send_response(200)
+        self.send_header("Content-type", "text/plain")
+        self.end_headers()
+        self.wfile.write(b"Nothing malicious detected. PASSED!")
+
     def do_GET(self):
         path = self.path
         body = ""  # GET requests don't have a body
 
+        if self.reputation_fast_path(path, body, "") or self.route_fast_path(path, body, ""):
+            return
+
         # Extract features and check model
         features = np.array(ExtractFeatures(path, body)).reshape(1, -1)
         prediction = model.predict(features)[0]
@@ -219,9 +246,11 @@ class WAFServer(SimpleHTTPRequestHandler):
             or (malicious_prob > 0.7)
         )
 
-        # Append payload to respective CSV
+        # Record payload in the sample store for retraining
         if is_malicious:
-            append_payload_to_csv(MALICIOUS_CSV, path, body)
+            sample_store.add(path, body, 1, malicious_prob)
+            if reputation:
+                reputation.record_offense(self.client_ip())
             
             # Build detailed reason
             reasons = []
@@ -248,17 +277,19 @@ class WAFServer(SimpleHTTPRequestHandler):
             self.send_header("Content-type", "text/plain")
             self.end_headers()
             self.wfile.write(f"Malicious request detected!\nReason: {reason}".encode())
-            print(f"[BLOCKED] {self.client_address[0]} {path}")
+            print(f"[BLOCKED] {self.client_ip()} {path}")
             print(f"  └─ Reason: {reason}")
         else:
-            # Append benign payload
-            append_payload_to_csv(BENIGN_CSV, path, body)
+            # Record benign payload
+            sample_store.add(path, body, 0, malicious_prob)
+            if reputation:
+                reputation.record_clean(self.client_ip())
 
             self.send_response(200)
             self.send_header("Content-type", "text/plain")
             self.end_headers()
             self.wfile.write(b"Nothing malicious detected. PASSED!")
-            print(f"[PASSED] {self.client_address[0]} {path} (ML: {prediction}, Prob: {malicious_prob:.2%})")
+            print(f"[PASSED] {self.client_ip()} {path} (ML: {prediction}, Prob: {malicious_prob:.2%})")
 
     def do_POST(self):
         # Get the path
@@ -271,6 +302,9 @@ class WAFServer(SimpleHTTPRequestHandler):
         # Read the request body (payload)
         raw_body = self.rfile.read(content_length)
         body = parse_body(content_type, raw_body)
+
+        if self.reputation_fast_path(path, body, " POST") or self.route_fast_path(path, body, " POST"):
+            return
         
         # Extract features and check model
         features = np.array(ExtractFeatures(path, body)).reshape(1, -1)
@@ -310,9 +344,11 @@ class WAFServer(SimpleHTTPRequestHandler):
             or (malicious_prob > 0.7)
         )
 
-        # Append payload to respective CSV
+        # Record payload in the sample store for retraining
         if is_malicious:
-            append_payload_to_csv(MALICIOUS_CSV, path, body)
+            sample_store.add(path, body, 1, malicious_prob)
+            if reputation:
+                reputation.record_offense(self.client_ip())
             
             # Build detailed reason
             reasons = []
@@ -341,24 +377,33 @@ class WAFServer(SimpleHTTPRequestHandler):
             self.send_header("Content-type", "text/plain")
             self.end_headers()
             self.wfile.write(f"Malicious payload detected!\nReason: {reason}".encode())
-            print(f"[BLOCKED POST] {self.client_address[0]} {path}")
+            print(f"[BLOCKED POST] {self.client_ip()} {path}")
             print(f"  └─ Payload: {body[:100]}..." if len(body) > 100 else f"  └─ Payload: {body}")
             print(f"  └─ Reason: {reason}")
         else:
-            # Append benign payload
-            append_payload_to_csv(BENIGN_CSV, path, body)
+            # Record benign payload
+            sample_store.add(path, body, 0, malicious_prob)
+            if reputation:
+                reputation.record_clean(self.client_ip())
 
             self.send_response(200)
             self.send_header("Content-type", "text/plain")
             self.end_headers()
             self.wfile.write(b"Nothing malicious detected. PASSED!")
-            print(f"[PASSED POST] {self.client_address[0]} {path} (ML: {prediction}, Prob: {malicious_prob:.2%})")
+            print(f"[PASSED POST] {self.client_ip()} {path} (ML: {prediction}, Prob: {malicious_prob:.2%})")
 
 if __name__ == "__main__":
+    init_sample_store()
+    build_route_index()
+
     # Start retrain thread
     retrain_thread = threading.Thread(target=retrain_model, daemon=True)
     retrain_thread.start()
 
+    # Start route index refresh thread
+    route_thread = threading.Thread(target=refresh_route_index, daemon=True)
+    route_thread.start()
+
     # Use port 8081 to avoid conflict with UI server (8080)
     # You can change this if needed
     host, port = '127.0.0.1', 8081
@@ -370,3 +415,4 @@ if __name__ == "__main__":
     except KeyboardInterrupt:
         print("\nStopping server...")
         server.server_close()
+        sample_store.save()
@@ -0,0 +1,283 @@
+#!/usr/bin/env python3
+"""
+Training Dataset Store - Columnar, memory-mapped feature arrays
+Imports every existing CSV layout into one directory of .npy arrays
+tagged with the feature schema they were computed under
+
+Store layout:
+    meta.json            schema version/fingerprint, row count, sources
+    X.npy                int32 (rows x features), column-major
+    y.npy                int8 labels (0 = benign, 1 = malicious)
+    path.bin, body.bin   raw utf-8 text, concatenated
+    path_offsets.npy     int64 (rows + 1) offsets into path.bin
+    body_offsets.npy     int64 (rows + 1) offsets into body.bin
+"""
+
+import argparse
+import csv
+import json
+import os
+import shutil
+import sys
+import tempfile
+from array import array
+
+import numpy as np
+
+from features import ExtractFeatures, FEATURE_NAMES, FEATURE_SCHEMA_VERSION, schema_fingerprint
+
+META_FILE = 'meta.json'
+
+# CSV exports hold very long payloads (e.g. scanner bodies)
+csv.field_size_limit(sys.maxsize)
+
+
+class StaleSchemaError(ValueError):
+    """Raised when a store was built under a different feature schema"""
+
+
+LABELS = {
+    '0': 0, 'good': 0, 'benign': 0,
+    '1': 1, 'bad': 1, 'malicious': 1,
+}
+
+
+def parse_label(value):
+    return LABELS.get(str(value).strip().lower())
+
+
+# --------------------- Importers ---------------------
+# Each importer yields (path, body, label) and ignores any precomputed
+# features in the file; features are recomputed under the current schema.
+
+def iter_collection_csv(csv_path, label=None):
+    """Data_Collection/*.csv: method,path,body,<12 features>,class
+
+    Also reads Testing_Data/*.csv, which add Prediction or a stringified
+    ``features`` list after ``class``.
+    """
+    with open(csv_path, 'r', newline='', encoding='utf-8-sig') as f:
+        for row in csv.DictReader(f):
+            row_label = label if label is not None else parse_label(row.get('class', ''))
+            if row_label is None:
+                continue
+            yield row.get('path') or '', row.get('body') or '', row_label
+
+
+def iter_payload_csv(csv_path, label=None):
+    """Proxy self-training CSVs: path,body,<12 features> with no header or class"""
+    if label is None:
+        raise ValueError(f"{csv_path}: payload CSVs carry no class column, a label is required")
+    with open(csv_path, 'r', newline='', encoding='utf-8') as f:
+        for row in csv.reader(f):
+            if len(row) < 2:
+                continue
+            yield row[0], row[1], label
+
+
+IMPORTERS = {
+    'collection': iter_collection_csv,
+    'testing': iter_collection_csv,
+    'payloads': iter_payload_csv,
+}
+
+
+# --------------------- Build / load ---------------------
+
+def _write_store(store_dir, rows, sources):
+    """Featurize (path, body, label) rows and write them as a store
+
+    The store is built in a sibling temp directory and swapped into place
+    only once complete, so a failed build leaves any existing store intact.
+    """
+    store_dir = os.path.normpath(store_dir)
+    parent = os.path.dirname(store_dir) or '.'
+    os.makedirs(parent, exist_ok=True)
+    tmp_dir = tempfile.mkdtemp(prefix=os.path.basename(store_dir) + '.build-', dir=parent)
+    # mkdtemp creates 0700; the finished store should be as readable as before
+    os.chmod(tmp_dir, 0o755)
+    try:
+        meta = _write_store_files(tmp_dir, rows, sources)
+    except BaseException:
+        shutil.rmtree(tmp_dir, ignore_errors=True)
+        raise
+
+    old_dir = None
+    if os.path.exists(store_dir):
+        old_dir = tempfile.mkdtemp(prefix=os.path.basename(store_dir) + '.old-', dir=parent)
+        os.rmdir(old_dir)
+        os.rename(store_dir, old_dir)
+    os.rename(tmp_dir, store_dir)
+    if old_dir:
+        shutil.rmtree(old_dir, ignore_errors=True)
+    return meta
+
+
+def _write_store_files(store_dir, rows, sources):
+    meta_path = os.path.join(store_dir, META_FILE)
+
+    features = array('i')
+    labels = array('b')
+    path_offsets = array('q', [0])
+    body_offsets = array('q', [0])
+
+    with open(os.path.join(store_dir, 'path.bin'), 'wb') as path_f, \
+            open(os.path.join(store_dir, 'body.bin'), 'wb') as body_f:
+        for path, body, label in rows:
+            features.extend(ExtractFeatures(path, body))
+            labels.append(label)
+            path_bytes = path.encode('utf-8', 'surrogateescape')
+            body_bytes = body.encode('utf-8', 'surrogateescape')
+            path_f.write(path_bytes)
+            body_f.write(body_bytes)
+            path_offsets.append(path_offsets[-1] + len(path_bytes))
+            body_offsets.append(body_offsets[-1] + len(body_bytes))
+
+    n_rows = len(labels)
+    X = np.frombuffer(features, dtype=np.int32).reshape(n_rows, len(FEATURE_NAMES))
+    np.save(os.path.join(store_dir, 'X.npy'), np.asfortranarray(X))
+    np.save(os.path.join(store_dir, 'y.npy'), np.frombuffer(labels, dtype=np.int8))
+    np.save(os.path.join(store_dir, 'path_offsets.npy'), np.frombuffer(path_offsets, dtype=np.int64))
+    np.save(os.path.join(store_dir, 'body_offsets.npy'), np.frombuffer(body_offsets, dtype=np.int64))
+
+    meta = {
+        'schema_version': FEATURE_SCHEMA_VERSION,
+        'schema_fingerprint': schema_fingerprint(),
+        'feature_names': FEATURE_NAMES,
+        'rows': n_rows,
+        'sources': sources,
+    }
+    with open(meta_path, 'w', encoding='utf-8') as f:
+        json.dump(meta, f, indent=2)
+    return meta
+
+
+def build_dataset(store_dir, sources):
+    """Build a store from a list of (layout, csv_path, label_or_None)"""
+    def rows():
+        for layout, csv_path, label in sources:
+            yield from IMPORTERS[layout](csv_path, label)
+
+    source_meta = [{'layout': layout, 'path': csv_path, 'label': label}
+                   for layout, csv_path, label in sources]
+    return _write_store(store_dir, rows(), source_meta)
+
+
+def read_meta(store_dir):
+    meta_path = os.path.join(store_dir, META_FILE)
+    if not os.path.exists(meta_path):
+        raise FileNotFoundError(f"{store_dir} is not a dataset store (missing {META_FILE})")
+    with open(meta_path, 'r', encoding='utf-8') as f:
+        return json.load(f)
+
+
+def is_stale(meta):
+    return meta.get('schema_fingerprint') != schema_fingerprint()
+
+
+def load_dataset(store_dir, allow_stale=False):
+    """Memory-map X and y from a store
+
+    Raises StaleSchemaError if the store's features were computed under a
+    different schema than features.py currently defines.
+    """
+    meta = read_meta(store_dir)
+    if is_stale(meta) and not allow_stale:
+        raise StaleSchemaError(
+            f"{store_dir} was built with feature schema v{meta.get('schema_version')} "
+            f"({meta.get('schema_fingerprint')}), current is v{FEATURE_SCHEMA_VERSION} "
+            f"({schema_fingerprint()}); run: python3 dataset_store.py rebuild {store_dir}")
+    X = np.load(os.path.join(store_dir, 'X.npy'), mmap_mode='r')
+    y = np.load(os.path.join(store_dir, 'y.npy'), mmap_mode='r')
+    return X, y
+
+
+def iter_text(store_dir):
+    """Yield (path, body, label) for every row, in store order"""
+    path_offsets = np.load(os.path.join(store_dir, 'path_offsets.npy'), mmap_mode='r')
+    body_offsets = np.load(os.path.join(store_dir, 'body_offsets.npy'), mmap_mode='r')
+    y = np.load(os.path.join(store_dir, 'y.npy'), mmap_mode='r')
+    with open(os.path.join(store_dir, 'path.bin'), 'rb') as path_f, \
+            open(os.path.join(store_dir, 'body.bin'), 'rb') as body_f:
+        for i in range(len(y)):
+            path = path_f.read(int(path_offsets[i + 1] - path_offsets[i]))
+            body = body_f.read(int(body_offsets[i + 1] - body_offsets[i]))
+            yield path.decode('utf-8', 'surrogateescape'), body.decode('utf-8', 'surrogateescape'), int(y[i])
+
+
+def rebuild_dataset(store_dir):
+    """Recompute features for an existing store under the current schema"""
+    meta = read_meta(store_dir)
+    return _write_store(store_dir, iter_text(store_dir), meta.get('sources', []))
+
+
+# --------------------- CLI ---------------------
+
+def parse_source(spec):
+    """layout:path[:label], e.g. payloads:benign_payloads.csv:0"""
+    layout, _, rest = spec.partition(':')
+    if layout not in IMPORTERS or not rest:
+        raise argparse.ArgumentTypeError(
+            f"expected <{'|'.join(sorted(IMPORTERS))}>:<csv>[:<label>], got {spec!r}")
+    csv_path, label = rest, None
+    head, sep, tail = rest.rpartition(':')
+    if sep and parse_label(tail) is not None:
+        csv_path, label = head, parse_label(tail)
+    if layout == 'payloads' and label is None:
+        raise argparse.ArgumentTypeError(
+            f"payload CSVs carry no class column, give a label: payloads:{csv_path}:<0|1>")
+    return layout, csv_path, label
+
+
+def cmd_build(args):
+    for _, csv_path, _ in args.source:
+        if not os.path.exists(csv_path):
+            print(f"[ERROR] {csv_path} doesn't exist")
+            sys.exit(1)
+    meta = build_dataset(args.store, args.source)
+    print(f"[DATASET] Built {args.store}: {meta['rows']} rows, schema v{meta['schema_version']} "
+          f"({meta['schema_fingerprint']})")
+
+
+def cmd_info(args):
+    meta = read_meta(args.store)
+    X, y = load_dataset(args.store, allow_stale=True)
+    status = "STALE" if is_stale(meta) else "current"
+    print(f"[DATASET] {args.store}")
+    print(f"  └─ Rows:    {meta['rows']} (benign: {int((y == 0).sum())}, malicious: {int((y == 1).sum())})")
+    print(f"  └─ Schema:  v{meta['schema_version']} ({meta['schema_fingerprint']}) [{status}]")
+    for source in meta.get('sources', []):
+        print(f"  └─ Source:  {source['layout']}:{source['path']}"
+              + (f" (label {source['label']})" if source['label'] is not None else ""))
+
+
+def cmd_rebuild(args):
+    meta = rebuild_dataset(args.store)
+    print(f"[DATASET] Rebuilt {args.store}: {meta['rows']} rows under schema v{meta['schema_version']} "
+          f"({meta['schema_fingerprint']})")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Columnar training dataset store")
+    sub = parser.add_subparsers(dest='command', required=True)
+
+    p_build = sub.add_parser('build', help="Import CSVs into a new store")
+    p_build.add_argument('store', help="Store directory")
+    p_build.add_argument('-s', '--source', type=parse_source, action='append', required=True,
+                         help="layout:csv[:label], layout is collection, testing or payloads")
+    p_build.set_defaults(func=cmd_build)
+
+    p_info = sub.add_parser('info', help="Show row counts and schema status")
+    p_info.add_argument('store')
+    p_info.set_defaults(func=cmd_info)
+
+    p_rebuild = sub.add_parser('rebuild', help="Recompute features under the current schema")
+    p_rebuild.add_argument('store')
+    p_rebuild.set_defaults(func=cmd_rebuild)
+
+    args = parser.parse_args()
+    args.func(args)
+
+
+if __name__ == "__main__":
+    main()
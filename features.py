@@ -0,0 +1,90 @@
+"""
+Feature extraction shared by the WAF, the dataset store and training
+Any change to the feature set, badword list, thresholds or the body of
+ExtractFeatures changes the schema fingerprint, so stores built under the old schema are detected
+"""
+
+import hashlib
+import inspect
+import json
+from urllib import parse
+
+# Bump when the meaning or order of FEATURE_NAMES changes
+FEATURE_SCHEMA_VERSION = 1
+
+FEATURE_NAMES = [
+    'single_q', 'double_q', 'dashes', 'braces', 'spaces', 'percentages',
+    'semicolons', 'angle_brackets', 'special_chars', 'path_length', 'body_length', 'badwords_count',
+]
+
+# Raw '%' and ' ' counts at or below this are treated as noise and zeroed
+RAW_COUNT_THRESHOLD = 3
+
+# Characters counted by the special_chars feature
+SPECIAL_CHARS = '$&|'
+
+# List of suspicious keywords - SQL injection and XSS patterns
+badwords = [
+    # SQL Injection keywords
+    'select', 'union', 'or', 'and', 'where', 'from', 'insert', 'update', 'delete',
+    'drop', 'table', 'database', 'exec', 'execute', 'script', 'waitfor', 'delay',
+    'sleep', 'order by', 'group by', 'having', 'join', 'inner join', 'outer join',
+    # XSS and Scripting
+    'script', '<script', '</script>', 'javascript:', 'onerror', 'onclick', 'onload',
+    'alert', 'eval', 'document.cookie', 'document.write',
+    # Other suspicious patterns
+    'admin', 'uid', 'password', 'passwd', 'root', 'system', 'cmd', 'command',
+    'shell', 'phpinfo', 'base64', 'char(', 'ascii('
+]
+
+
+def ExtractFeatures(path, body):
+    path = str(path)
+    body = str(body)
+    combined_raw = path + body
+    raw_percentages = combined_raw.count("%")
+    raw_spaces = combined_raw.count(" ")
+
+    raw_percentages_count = raw_percentages if raw_percentages > RAW_COUNT_THRESHOLD else 0
+    raw_spaces_count = raw_spaces if raw_spaces > RAW_COUNT_THRESHOLD else 0
+
+    path_decoded = parse.unquote_plus(path)
+    body_decoded = parse.unquote_plus(body)
+
+    single_q = path_decoded.count("'") + body_decoded.count("'")
+    double_q = path_decoded.count('"') + body_decoded.count('"')
+    dashes = path_decoded.count("--") + body_decoded.count("--")
+    braces = path_decoded.count("(") + body_decoded.count("(")
+    spaces = path_decoded.count(" ") + body_decoded.count(" ")
+    semicolons = path_decoded.count(";") + body_decoded.count(";")
+    angle_brackets = path_decoded.count("<") + path_decoded.count(">") + body_decoded.count("<") + body_decoded.count(">")
+    special_chars = sum(path_decoded.count(c) + body_decoded.count(c) for c in SPECIAL_CHARS)
+    badwords_count = sum(path_decoded.lower().count(word) + body_decoded.lower().count(word) for word in badwords)
+    path_length = len(path_decoded)
+    body_length = len(body_decoded)
+
+    return [single_q, double_q, dashes, braces, spaces, raw_percentages_count,
+            semicolons, angle_brackets, special_chars, path_length, body_length, badwords_count]
+
+
+def _extractor_digest():
+    """Hash of the ExtractFeatures source, so edits to it stale old stores"""
+    try:
+        source = inspect.getsource(ExtractFeatures).encode()
+    except (OSError, TypeError):
+        # No source on disk (e.g. only .pyc shipped); fall back to the bytecode
+        source = ExtractFeatures.__code__.co_code
+    return hashlib.sha256(source).hexdigest()
+
+
+def schema_fingerprint():
+    """Short hash of everything that determines ExtractFeatures' output"""
+    spec = {
+        'version': FEATURE_SCHEMA_VERSION,
+        'features': FEATURE_NAMES,
+        'raw_count_threshold': RAW_COUNT_THRESHOLD,
+        'special_chars': SPECIAL_CHARS,
+        'badwords': badwords,
+        'extractor': _extractor_digest(),
+    }
+    return hashlib.sha256(json.dumps(spec, sort_keys=True).encode()).hexdigest()[:16]
@@ -0,0 +1,64 @@
+"""
+Heuristic Detectors - Cheap badword and regex checks
+Shared by the WAF's deep inspection and every fast path that skips the
+ML model (reputation-clean sources, the positive-security route index)
+"""
+
+import re
+from urllib import parse
+
+from features import badwords
+
+SQL_PATTERNS = [
+    r"(?i)\bunion\s+select\b",
+    r"(?i)'\s*or\s*'1'='1",
+    r"(?i)or\s+1=1",
+    r"(?i)order\s+by\s+\d+",
+    r"(?i);?\s*drop\s+table",
+]
+XSS_PATTERNS = [
+    r"(?i)<script[^>]*>",
+    r"(?i)javascript:\s*",
+    r"(?i)onerror\s*=",
+    r"(?i)onload\s*=",
+]
+RCE_PATTERNS = [
+    r"(?i)(;|&&|\|\|)\s*(sh|bash|cmd|powershell)\b",
+    r"(?i)\b(system|exec|popen|passthru)\s*\(",
+]
+FILE_INCLUSION_PATTERNS = [
+    r"(?i)(\.|\/){2,}",            # ../ traversal
+    r"(?i)\b(file|php|data|zip|expect)://",
+]
+SSRF_PATTERNS = [
+    r"(?i)\b(127\.0\.0\.1|0\.0\.0\.0|169\.254\.|localhost|\[::1\])\b",
+    r"(?i)\bhttp(s)?://metadata/",
+]
+IDOR_HINTS = [
+    r"(?i)\b(user|account|id|uid)=\d{3,}\b",
+]
+
+def find_matches(text: str, patterns):
+    hits = []
+    for p in patterns:
+        if re.search(p, text):
+            hits.append(p)
+    return hits
+
+def heuristic_hits(path, body):
+    """True if the cheap badword/regex checks flag the request"""
+    combined_text = path.lower() + " " + body.lower()
+    if any(word.lower() in combined_text for word in badwords):
+        return True
+    return any(find_matches(combined_text, patterns) for patterns in (
+        SQL_PATTERNS, XSS_PATTERNS, RCE_PATTERNS, FILE_INCLUSION_PATTERNS, SSRF_PATTERNS, IDOR_HINTS))
+
+
+def flagged(path, body):
+    """Badword/regex checks on both the raw and the URL-decoded request
+
+    Deep inspection scores the decoded text, so fast paths must check it too.
+    """
+    path, body = str(path), str(body)
+    return (heuristic_hits(path, body)
+            or heuristic_hits(parse.unquote_plus(path), parse.unquote_plus(body)))
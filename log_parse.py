@@ -2,11 +2,12 @@ import xml.etree.ElementTree as ET
 import urllib.parse
 import base64
 import os
+import sys
 import csv
-
-log_path = 'bad_request.log'
-output_csv_log = '2bad_req.csv'
-class_flag = "bad"
+import argparse
+import collections
+import hashlib
+from concurrent.futures import ProcessPoolExecutor
 
 
 class LogParse:
@@ -14,7 +15,7 @@ class LogParse:
                 'drop', 'script']
 
     @staticmethod
-    def extract_features(method, path_enc, body_enc, headers):
+    def extract_features(method, path_enc, body_enc, headers, class_flag="bad"):
         # Count percentages, spaces, and special characters in the raw (encoded) URL and body
         combined_raw = path_enc + body_enc
         raw_percentages = combined_raw.count("%")
@@ -54,27 +55,60 @@ class LogParse:
                 class_flag]
 
 
-def parse_log(log_path):
-    result = {}
-    if not os.path.exists(log_path):
-        print("[+] Error!!!", log_path, "doesn't exist..")
-        exit()
-
-    try:
-        tree = ET.parse(log_path)
-    except Exception as e:
-        print(
-            '[+] Oops..! Please make sure binary data is not present in Log, like raw image dump, flash (.swf files) '
-            'dump etc.')
-        exit()
-
-    root = tree.getroot()
-    for reqs in root.findall('item'):
-        raw_req = reqs.find('request').text
-        raw_req = urllib.parse.unquote(raw_req)
-        raw_resp = reqs.find('response').text
-        result[raw_req] = raw_resp
-    return result
+def iter_log_requests(log_path):
+    """Stream the raw (still base64-encoded) request of every <item> in the log
+
+    Elements are cleared as soon as they are read so memory does not grow
+    with the size of the export. Responses are never retained.
+    """
+    context = ET.iterparse(log_path, events=('start', 'end'))
+    _, root = next(context)
+    for event, elem in context:
+        if event == 'end' and elem.tag == 'item':
+            req = elem.find('request')
+            if req is not None and req.text:
+                yield urllib.parse.unquote(req.text)
+            elem.clear()
+            root.clear()
+
+
+def iter_unique_chunks(requests, chunk_size):
+    """Drop duplicate requests by content hash and group the rest into chunks"""
+    seen = set()
+    chunk = []
+    for raw_req in requests:
+        digest = hashlib.blake2b(raw_req.encode('utf-8', 'surrogateescape'), digest_size=16).digest()
+        if digest in seen:
+            continue
+        seen.add(digest)
+        chunk.append(raw_req)
+        if len(chunk) >= chunk_size:
+            yield chunk
+            chunk = []
+    if chunk:
+        yield chunk
+
+
+def featurize_chunk(chunk, class_flag):
+    """Featurize a chunk of requests; returns (rows, number of malformed requests skipped)"""
+    rows = []
+    skipped = 0
+    for items in chunk:
+        try:
+            raw_req = base64.b64decode(items)
+            headers, method, body, path, http_version = parse_raw_http_req(raw_req)
+        except Exception:
+            skipped += 1
+            continue
+        rows.append(LogParse.extract_features(method, path, body, headers, class_flag))
+    return rows, skipped
+
+
+def positive_int(value):
+    number = int(value)
+    if number < 1:
+        raise argparse.ArgumentTypeError(f"must be at least 1, got {value}")
+    return number
 
 
 def parse_raw_http_req(rawreq):
@@ -105,20 +139,55 @@ def parse_raw_http_req(rawreq):
     return headers, method, body, path, http_version
 
 
-# Write header to CSV file
-with open(output_csv_log, 'w', newline='') as f:
-    c = csv.writer(f)
-    c.writerow(
-        ["method", "path", "body", "single_q", "double_q", "dashes", "braces", "spaces", "percentages", "semicolons",
-         "angle_brackets", "special_chars", "path_length", "body_length", "badwords_count", "class"])
-
-# Parse the log and write the data to the CSV file
-result = parse_log(log_path)
-
-with open(output_csv_log, 'a', newline='') as f:
-    c = csv.writer(f)
-    for items in result:
-        raw_req = base64.b64decode(items)
-        headers, method, body, path, http_version = parse_raw_http_req(raw_req)
-        features = LogParse.extract_features(method, path, body, headers)
-        c.writerow(features)
+def main():
+    parser = argparse.ArgumentParser(description="Convert a Burp-style XML log export into a feature CSV")
+    parser.add_argument('log_path', nargs='?', default='bad_request.log', help="XML log export")
+    parser.add_argument('-o', '--output', default='2bad_req.csv', help="Output CSV")
+    parser.add_argument('-c', '--class-flag', default='bad', help="Value for the class column")
+    parser.add_argument('-j', '--workers', type=positive_int, default=os.cpu_count() or 1, help="Worker processes")
+    parser.add_argument('--chunk-size', type=positive_int, default=1000, help="Requests per worker task")
+    args = parser.parse_args()
+
+    if not os.path.exists(args.log_path):
+        print("[+] Error!!!", args.log_path, "doesn't exist..")
+        sys.exit(1)
+
+    written = 0
+    skipped = 0
+    with open(args.output, 'w', newline='') as f:
+        c = csv.writer(f)
+        c.writerow(
+            ["method", "path", "body", "single_q", "double_q", "dashes", "braces", "spaces", "percentages",
+             "semicolons", "angle_brackets", "special_chars", "path_length", "body_length", "badwords_count",
+             "class"])
+
+        chunks = iter_unique_chunks(iter_log_requests(args.log_path), args.chunk_size)
+        # Keep only a bounded number of chunks in flight so a fast reader
+        # cannot queue the whole export in memory ahead of the workers
+        max_pending = args.workers * 2
+        pending = collections.deque()
+        try:
+            with ProcessPoolExecutor(max_workers=args.workers) as pool:
+                for chunk in chunks:
+                    pending.append(pool.submit(featurize_chunk, chunk, args.class_flag))
+                    if len(pending) >= max_pending:
+                        rows, chunk_skipped = pending.popleft().result()
+                        c.writerows(rows)
+                        written += len(rows)
+                        skipped += chunk_skipped
+                while pending:
+                    rows, chunk_skipped = pending.popleft().result()
+                    c.writerows(rows)
+                    written += len(rows)
+                    skipped += chunk_skipped
+        except ET.ParseError:
+            print(
+                '[+] Oops..! Please make sure binary data is not present in Log, like raw image dump, flash (.swf '
+                'files) dump etc.')
+            sys.exit(1)
+
+    print(f"[+] Wrote {written} unique requests to {args.output} ({skipped} malformed requests skipped)")
+
+
+if __name__ == "__main__":
+    main()
@@ -4,7 +4,6 @@ Network Layer Firewall - Dual-Layer Firewall System
 Intercepts packets at network layer and applies ML-based blocking
 """
 
-import netfilterqueue
 import socket
 import struct
 import threading
@@ -14,6 +13,14 @@ import os
 from scapy.all import IP, TCP, UDP, ICMP
 import numpy as np
 import pickle
+from reputation import ReputationTable, DEFAULT_PATH as REPUTATION_PATH
+
+# netfilterqueue is only needed for live interception; offline replay
+# (network_replay.py) drives process_packet without it
+try:
+    import netfilterqueue
+except ImportError:
+    netfilterqueue = None
 
 # Network firewall model (separate from WAF model)
 NETWORK_MODEL_PATH = 'network_firewall_model.pkl'
@@ -29,6 +36,21 @@ except FileNotFoundError:
     print(f"[NETWORK FIREWALL] No model found, using rule-based detection only")
     network_model = None
 
+# Reputation table shared with the application WAF (Proxy_server.py).
+# Opened by open_reputation() in main() so importing this module (e.g. from
+# network_replay.py) never touches the live shared table.
+reputation = None
+
+def open_reputation(path=REPUTATION_PATH):
+    """Attach the shared reputation table, falling back to the local blocklist"""
+    global reputation
+    try:
+        reputation = ReputationTable(path)
+        print(f"[NETWORK FIREWALL] Shared reputation table: {path}")
+    except (OSError, ValueError) as e:
+        print(f"[NETWORK FIREWALL] Reputation table unavailable ({e}), using local blocklist only")
+        reputation = None
+
 # Suspicious IP patterns (for demonstration)
 SUSPICIOUS_IPS = set()
 BLOCKED_IPS = set()
@@ -104,8 +126,12 @@ def ip_to_int(ip):
     except:
         return 0
 
-def is_suspicious_network(features_dict):
-    """Check if network packet is suspicious using ML + rules"""
+def is_suspicious_network(features_dict, timings=None):
+    """Check if network packet is suspicious using ML + rules
+
+    If a ``timings`` dict is given, time spent in the ML model is
+    accumulated into its ``ml`` key in seconds.
+    """
     if not features_dict:
         return False, "Invalid packet"
     
@@ -118,6 +144,10 @@ def is_suspicious_network(features_dict):
     if src_ip in BLOCKED_IPS:
         return True, "Blocked IP"
     
+    # Rule 1b: Sources convicted by either layer (shared reputation)
+    if reputation and reputation.is_blocked(src_ip):
+        return True, "Reputation: convicted source"
+    
     # Rule 2: Suspicious ports (common attack ports)
     suspicious_ports = [22, 23, 3389, 1433, 3306, 5432, 27017]  # SSH, Telnet, RDP, DB ports
     if dst_port in suspicious_ports and protocol == 6:  # TCP
@@ -129,6 +159,7 @@ def is_suspicious_network(features_dict):
     
     # Rule 4: ML model prediction (if available)
     if network_model:
+        ml_start = time.perf_counter()
         try:
             features = np.array(features_dict['features']).reshape(1, -1)
             prediction = network_model.predict(features)[0]
@@ -141,6 +172,9 @@ def is_suspicious_network(features_dict):
                 return True, "ML prediction: malicious"
         except Exception as e:
             pass  # Fall back to rules
+        finally:
+            if timings is not None:
+                timings['ml'] = timings.get('ml', 0.0) + (time.perf_counter() - ml_start)
     
     # Rule 5: Rate limiting (connection flooding)
     current_time = time.time()
@@ -152,6 +186,8 @@ def is_suspicious_network(features_dict):
     
     if connection_counts[key] > 100:  # More than 100 connections/min
         BLOCKED_IPS.add(src_ip)
+        if reputation:
+            reputation.block(src_ip)
         return True, "Rate limit exceeded"
     
     return False, "Allowed"
@@ -183,19 +219,37 @@ def log_network_decision(decision, features_dict, reason):
             reason
         ])
 
-def process_packet(packet):
-    """Process each intercepted packet"""
+def process_packet(packet, timings=None):
+    """Process each intercepted packet
+
+    If a ``timings`` dict is given, the time spent in each stage
+    (extract, rules, ml, log) is accumulated into it in seconds.
+    """
     try:
+        t0 = time.perf_counter()
         features_dict = extract_network_features(packet)
+        t1 = time.perf_counter()
         
         if not features_dict:
+            if timings is not None:
+                timings['extract'] = timings.get('extract', 0.0) + (t1 - t0)
             packet.accept()
             return
         
-        is_malicious, reason = is_suspicious_network(features_dict)
+        ml_before = timings.get('ml', 0.0) if timings is not None else 0.0
+        is_malicious, reason = is_suspicious_network(features_dict, timings)
+        t2 = time.perf_counter()
         
         # Log decision
         log_network_decision(is_malicious, features_dict, reason)
+        t3 = time.perf_counter()
+        
+        if timings is not None:
+            timings['extract'] = timings.get('extract', 0.0) + (t1 - t0)
+            # Rules (blocklists, reputation, ports, rate limit) exclude the ML model
+            ml_spent = timings.get('ml', 0.0) - ml_before
+            timings['rules'] = timings.get('rules', 0.0) + (t2 - t1 - ml_spent)
+            timings['log'] = timings.get('log', 0.0) + (t3 - t2)
         
         if is_malicious:
             print(f"[NETWORK BLOCKED] {features_dict['src_ip']}:{features_dict['src_port']} -> "
@@ -244,12 +298,19 @@ def main():
     signal.signal(signal.SIGINT, signal_handler)
     signal.signal(signal.SIGTERM, signal_handler)
     
+    if netfilterqueue is None:
+        print("[ERROR] netfilterqueue is not installed (pip install netfilterqueue)")
+        print("For offline testing use: python3 network_replay.py replay <file.pcap>")
+        sys.exit(1)
+    
     # Check if running as root
     if os.geteuid() != 0:
         print("[ERROR] Network firewall must run as root (use sudo)")
         print("Run: sudo python3 network_firewall.py")
         sys.exit(1)
     
+    open_reputation()
+    
     # Setup iptables
     try:
         setup_iptables_queue()
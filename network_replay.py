@@ -0,0 +1,218 @@
+#!/usr/bin/env python3
+"""
+Network Firewall Replay - Offline benchmark for the network layer
+Feeds packets from pcap files through network_firewall.process_packet
+without iptables/NFQUEUE and reports throughput, per-stage latency
+and verdict counts
+"""
+
+import argparse
+import contextlib
+import os
+import random
+import sys
+import tempfile
+import time
+
+from scapy.all import IP, TCP, UDP, Raw, PcapReader, wrpcap
+
+import network_firewall
+from reputation import ReputationTable
+
+
+class ReplayPacket:
+    """Stand-in for netfilterqueue.Packet carrying a raw IP datagram"""
+
+    __slots__ = ('payload', 'verdict')
+
+    def __init__(self, payload):
+        self.payload = payload
+        self.verdict = None
+
+    def get_payload(self):
+        return self.payload
+
+    def accept(self):
+        self.verdict = 'accept'
+
+    def drop(self):
+        self.verdict = 'drop'
+
+
+def load_pcap(path):
+    """Read a pcap and return the raw IP layer bytes of every IP packet
+
+    NFQUEUE hands the firewall bare IP datagrams, so link-layer headers
+    are stripped and non-IP frames are skipped.
+    """
+    payloads = []
+    with PcapReader(path) as reader:
+        for pkt in reader:
+            if pkt.haslayer(IP):
+                payloads.append(bytes(pkt[IP]))
+    return payloads
+
+
+def reset_firewall_state(log_dir):
+    """Clear rate-limit/blocklist/reputation state and redirect decision logs"""
+    network_firewall.BLOCKED_IPS.clear()
+    network_firewall.SUSPICIOUS_IPS.clear()
+    network_firewall.connection_counts.clear()
+    network_firewall.last_reset = time.time()
+    network_firewall.NETWORK_BLOCKED_CSV = os.path.join(log_dir, 'network_blocked.csv')
+    network_firewall.NETWORK_ALLOWED_CSV = os.path.join(log_dir, 'network_allowed.csv')
+    # Use a private reputation table so replays neither see nor pollute live state
+    rep_path = os.path.join(log_dir, 'reputation.bin')
+    if os.path.exists(rep_path):
+        os.remove(rep_path)
+    network_firewall.reputation = ReputationTable(rep_path)
+
+
+def replay(payloads, quiet=True):
+    """Run every payload through process_packet and collect statistics"""
+    timings = {}
+    latencies = []
+    verdicts = {'accept': 0, 'drop': 0, 'none': 0}
+
+    # process_packet prints every block; keep that off the clock unless asked
+    out = open(os.devnull, 'w') if quiet else sys.stdout
+    try:
+        with contextlib.redirect_stdout(out):
+            start = time.perf_counter()
+            for payload in payloads:
+                packet = ReplayPacket(payload)
+                t0 = time.perf_counter()
+                network_firewall.process_packet(packet, timings)
+                latencies.append(time.perf_counter() - t0)
+                verdicts[packet.verdict or 'none'] += 1
+            elapsed = time.perf_counter() - start
+    finally:
+        if quiet:
+            out.close()
+
+    return {
+        'packets': len(payloads),
+        'elapsed': elapsed,
+        'timings': timings,
+        'latencies': latencies,
+        'verdicts': verdicts,
+    }
+
+
+def percentile(sorted_values, pct):
+    if not sorted_values:
+        return 0.0
+    index = min(len(sorted_values) - 1, int(round(pct / 100.0 * (len(sorted_values) - 1))))
+    return sorted_values[index]
+
+
+def print_report(stats):
+    packets = stats['packets']
+    elapsed = stats['elapsed']
+    print(f"[REPLAY] Packets:     {packets}")
+    print(f"[REPLAY] Elapsed:     {elapsed:.3f}s")
+    if elapsed > 0:
+        print(f"[REPLAY] Throughput:  {packets / elapsed:,.0f} packets/sec")
+
+    print("[REPLAY] Per-stage mean latency:")
+    for stage in ('extract', 'rules', 'ml', 'log'):
+        total = stats['timings'].get(stage, 0.0)
+        mean_us = total / packets * 1e6 if packets else 0.0
+        print(f"  └─ {stage:<8} {mean_us:10.2f} us")
+
+    latencies = sorted(stats['latencies'])
+    print("[REPLAY] End-to-end latency:")
+    for pct in (50, 90, 99):
+        print(f"  └─ p{pct:<7} {percentile(latencies, pct) * 1e6:10.2f} us")
+    if latencies:
+        print(f"  └─ max      {latencies[-1] * 1e6:10.2f} us")
+
+    print("[REPLAY] Verdicts:")
+    for verdict, count in stats['verdicts'].items():
+        print(f"  └─ {verdict:<8} {count}")
+
+
+# --------------------- Synthetic traffic ---------------------
+
+def generate_flood(count, src='10.0.0.66', dst='10.0.0.1', dport=80):
+    """SYN flood from a single source against one port"""
+    return [IP(src=src, dst=dst) / TCP(sport=random.randint(1024, 65535), dport=dport, flags='S')
+            for _ in range(count)]
+
+
+def generate_port_scan(count, src='10.0.0.77', dst='10.0.0.1', start_port=1):
+    """Sequential SYN scan of ``count`` ports from a single source"""
+    return [IP(src=src, dst=dst) / TCP(sport=40000, dport=(start_port + i - 1) % 65535 + 1, flags='S')
+            for i in range(count)]
+
+
+def generate_benign(count, dst='10.0.0.1'):
+    """Mixed web/DNS traffic spread over many clients"""
+    packets = []
+    for i in range(count):
+        src = f"192.168.{(i // 250) % 250}.{i % 250 + 1}"
+        if i % 5 == 0:
+            packets.append(IP(src=src, dst=dst) / UDP(sport=random.randint(1024, 65535), dport=53)
+                           / Raw(b'\x00' * 32))
+        else:
+            packets.append(IP(src=src, dst=dst) / TCP(sport=random.randint(1024, 65535),
+                                                      dport=random.choice([80, 443]), flags='PA')
+                           / Raw(b'GET / HTTP/1.1\r\nHost: example\r\n\r\n'))
+    return packets
+
+
+GENERATORS = {
+    'flood': generate_flood,
+    'scan': generate_port_scan,
+    'benign': generate_benign,
+}
+
+
+def cmd_generate(args):
+    packets = GENERATORS[args.kind](args.count)
+    wrpcap(args.output, packets)
+    print(f"[REPLAY] Wrote {len(packets)} {args.kind} packets to {args.output}")
+
+
+def cmd_replay(args):
+    payloads = []
+    for path in args.pcap:
+        if not os.path.exists(path):
+            print(f"[ERROR] {path} doesn't exist")
+            sys.exit(1)
+        payloads.extend(load_pcap(path))
+    payloads = payloads * args.repeat
+    print(f"[REPLAY] Loaded {len(payloads)} IP packets from {len(args.pcap)} file(s)")
+
+    log_dir = args.log_dir or tempfile.mkdtemp(prefix='network_replay_')
+    os.makedirs(log_dir, exist_ok=True)
+    reset_firewall_state(log_dir)
+    print(f"[REPLAY] Decision logs: {log_dir}")
+
+    stats = replay(payloads, quiet=not args.verbose)
+    print_report(stats)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Offline pcap replay for the network firewall")
+    sub = parser.add_subparsers(dest='command', required=True)
+
+    p_replay = sub.add_parser('replay', help="Replay pcap files through process_packet")
+    p_replay.add_argument('pcap', nargs='+', help="pcap file(s) to replay")
+    p_replay.add_argument('--repeat', type=int, default=1, help="Replay the loaded packets N times")
+    p_replay.add_argument('--log-dir', help="Directory for decision CSVs (default: a temp dir)")
+    p_replay.add_argument('--verbose', action='store_true', help="Show per-packet block messages")
+    p_replay.set_defaults(func=cmd_replay)
+
+    p_gen = sub.add_parser('generate', help="Write a synthetic pcap")
+    p_gen.add_argument('kind', choices=sorted(GENERATORS))
+    p_gen.add_argument('output', help="Output pcap path")
+    p_gen.add_argument('--count', type=int, default=10000)
+    p_gen.set_defaults(func=cmd_generate)
+
+    args = parser.parse_args()
+    args.func(args)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,200 @@
+"""
+Cross-Layer Reputation Table - Shared between WAFServer and network_firewall
+A fixed-size open-addressing hash table of IPv4 sources in a memory-mapped
+file. Each slot holds a decaying offense score, a clean-request streak and
+a block-until timestamp.
+
+Readers are lock-free: every slot carries a sequence counter (seqlock)
+that writers make odd while updating, and readers retry on a torn read.
+Writers from either process serialize on an flock of the file.
+"""
+
+import fcntl
+import mmap
+import os
+import socket
+import struct
+import time
+
+DEFAULT_PATH = '/dev/shm/waf_reputation.bin' if os.path.isdir('/dev/shm') else 'waf_reputation.bin'
+DEFAULT_SLOTS = 65536
+
+# Score halves every HALF_LIFE seconds without new offenses
+HALF_LIFE = 300.0
+# Decayed score at which a source is blocked at both layers
+BLOCK_SCORE = 5.0
+BLOCK_SECONDS = 600.0
+# Consecutive passed requests (with no live score) before a source counts as clean
+CLEAN_STREAK = 50
+# Below this decayed score a source has no live offenses
+SCORE_EPSILON = 0.05
+
+MAGIC = b'WAFREP01'
+HEADER = struct.Struct('<8sI')             # magic, slot count
+HEADER_SIZE = 64
+SLOT = struct.Struct('<IIfIdd')            # seq, ip, score, streak, updated, block_until
+SEQ = struct.Struct('<I')
+MAX_PROBE = 16
+READ_RETRIES = 1000
+
+
+def ip_key(ip):
+    """IPv4 address as a non-zero table key, or None if not tracked
+
+    Loopback is never tracked: the WAF is reached through it, and blocking
+    127.0.0.1 at the network layer would cut off every local service.
+    """
+    try:
+        key = struct.unpack('!I', socket.inet_aton(ip))[0]
+    except (OSError, TypeError):
+        return None
+    if key >> 24 == 127:
+        return None
+    return key or None
+
+
+class ReputationTable:
+
+    def __init__(self, path=DEFAULT_PATH, slots=DEFAULT_SLOTS):
+        size = HEADER_SIZE + slots * SLOT.size
+        # Both layers may run as different users; permissions follow the umask
+        self.fd = os.open(path, os.O_RDWR | os.O_CREAT, 0o666)
+        fcntl.flock(self.fd, fcntl.LOCK_EX)
+        try:
+            if os.fstat(self.fd).st_size < HEADER_SIZE:
+                os.ftruncate(self.fd, size)
+                os.pwrite(self.fd, HEADER.pack(MAGIC, slots), 0)
+            magic, slots = HEADER.unpack(os.pread(self.fd, HEADER.size, 0))
+            if magic != MAGIC:
+                raise ValueError(f"{path} is not a reputation table")
+        finally:
+            fcntl.flock(self.fd, fcntl.LOCK_UN)
+        self.path = path
+        self.slots = slots
+        self.mm = mmap.mmap(self.fd, HEADER_SIZE + slots * SLOT.size)
+
+    def close(self):
+        self.mm.close()
+        os.close(self.fd)
+
+    # --------------------- Slot access ---------------------
+
+    def _probe(self, key):
+        start = (key * 2654435761) % self.slots
+        for i in range(min(MAX_PROBE, self.slots)):
+            yield HEADER_SIZE + ((start + i) % self.slots) * SLOT.size
+
+    def _read(self, offset):
+        """Consistent snapshot of a slot without taking a lock"""
+        for _ in range(READ_RETRIES):
+            fields = SLOT.unpack_from(self.mm, offset)
+            if fields[0] & 1:
+                continue
+            if SEQ.unpack_from(self.mm, offset)[0] == fields[0]:
+                return fields
+        # A writer died mid-update; the slot is as good as it gets
+        return SLOT.unpack_from(self.mm, offset)
+
+    def _write(self, offset, key, score, streak, updated, block_until):
+        # Round down so a slot left odd by a crashed writer still goes odd -> even
+        seq = SEQ.unpack_from(self.mm, offset)[0] & ~1
+        SEQ.pack_into(self.mm, offset, (seq + 1) & 0xFFFFFFFF)
+        SLOT.pack_into(self.mm, offset, (seq + 1) & 0xFFFFFFFF, key, score, streak, updated, block_until)
+        SEQ.pack_into(self.mm, offset, (seq + 2) & 0xFFFFFFFF)
+
+    @staticmethod
+    def _decayed(score, updated, now):
+        if score <= 0.0:
+            return 0.0
+        return score * 0.5 ** (max(0.0, now - updated) / HALF_LIFE)
+
+    def _find(self, key):
+        for offset in self._probe(key):
+            fields = self._read(offset)
+            if fields[1] == key:
+                return fields
+            if fields[1] == 0:
+                return None
+        return None
+
+    def _update(self, ip, fn):
+        """Apply fn(score, streak, block_until, now) -> (score, streak, block_until) under the write lock"""
+        key = ip_key(ip)
+        if key is None:
+            return
+        now = time.time()
+        fcntl.flock(self.fd, fcntl.LOCK_EX)
+        try:
+            victim = None
+            victim_rank = None
+            for offset in self._probe(key):
+                _, slot_key, score, streak, updated, block_until = self._read(offset)
+                if slot_key == key:
+                    score = self._decayed(score, updated, now)
+                    break
+                if slot_key == 0:
+                    score, streak, block_until = 0.0, 0, 0.0
+                    break
+                # Probe window full: replace the least relevant entry
+                rank = (block_until > now, self._decayed(score, updated, now))
+                if victim_rank is None or rank < victim_rank:
+                    victim, victim_rank = offset, rank
+            else:
+                offset = victim
+                score, streak, block_until = 0.0, 0, 0.0
+            score, streak, block_until = fn(score, streak, block_until, now)
+            self._write(offset, key, score, streak, now, block_until)
+        finally:
+            fcntl.flock(self.fd, fcntl.LOCK_UN)
+
+    # --------------------- Public API ---------------------
+
+    def lookup(self, ip):
+        """Current (decayed) reputation of a source, or None if unknown"""
+        key = ip_key(ip)
+        if key is None:
+            return None
+        fields = self._find(key)
+        if fields is None:
+            return None
+        _, _, score, streak, updated, block_until = fields
+        now = time.time()
+        return {
+            'score': self._decayed(score, updated, now),
+            'clean_streak': streak,
+            'block_until': block_until,
+            'blocked': block_until > now,
+        }
+
+    def is_blocked(self, ip):
+        key = ip_key(ip)
+        if key is None:
+            return False
+        fields = self._find(key)
+        return fields is not None and fields[5] > time.time()
+
+    def clean_streak(self, ip):
+        """Consecutive passed requests if the source counts as clean, else 0"""
+        rep = self.lookup(ip)
+        if rep is None or rep['blocked'] or rep['score'] > SCORE_EPSILON:
+            return 0
+        return rep['clean_streak'] if rep['clean_streak'] >= CLEAN_STREAK else 0
+
+    def record_offense(self, ip, weight=1.0):
+        """Add to a source's score; blocks it once the score reaches BLOCK_SCORE"""
+        def apply(score, streak, block_until, now):
+            score += weight
+            if score >= BLOCK_SCORE - SCORE_EPSILON:
+                block_until = max(block_until, now + BLOCK_SECONDS)
+            return score, 0, block_until
+        self._update(ip, apply)
+
+    def record_clean(self, ip):
+        def apply(score, streak, block_until, now):
+            return score, min(streak + 1, 0xFFFFFFFF), block_until
+        self._update(ip, apply)
+
+    def block(self, ip, seconds=BLOCK_SECONDS):
+        def apply(score, streak, block_until, now):
+            return max(score, BLOCK_SCORE), 0, max(block_until, now + seconds)
+        self._update(ip, apply)
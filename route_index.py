@@ -0,0 +1,285 @@
+#!/usr/bin/env python3
+"""
+Positive-Security Route Index - Fast path for known-good endpoints
+Learns a path-segment trie from benign traffic with, per route, the
+expected parameter names, character classes and length bounds. Requests
+that fully conform to a learned route can skip ML and regex inspection.
+
+Only structured values are ever trusted: parameters seen with free text
+(spaces, quotes, brackets, ...) are marked ineligible, so requests
+carrying them always get deep inspection. Absolute paths and host names
+only conform where that shape was learned, and a request that trips the
+cheap badword/regex checks never conforms (nor is it learned from).
+"""
+
+import argparse
+import re
+from urllib import parse
+
+from heuristics import flagged
+
+# A route/parameter must be seen this many times before it is trusted
+MIN_ROUTE_SUPPORT = 3
+MIN_PARAM_SUPPORT = 3
+
+# Characters a fast-path value may contain (besides letters and digits)
+SAFE_PUNCTUATION = '-_.@,/'
+# Sequences that never conform even when built from safe characters
+UNSAFE_SEQUENCES = ('..', '//')
+
+DIGIT, LOWER, UPPER = 1, 2, 4
+PUNCT_BITS = {c: 8 << i for i, c in enumerate(SAFE_PUNCTUATION)}
+# Value shapes; like character classes they must have been learned to conform
+ABSOLUTE = 1 << 20   # starts with '/'
+HOSTLIKE = 1 << 21   # any '/' or '@' separated part looks like a host name or IPv4 address
+# Set when a value contained anything outside the safe set
+UNSAFE = 1 << 30
+
+COMMON_TLDS = {'com', 'net', 'org', 'edu', 'gov', 'mil', 'int', 'io', 'co', 'info', 'biz',
+               'me', 'us', 'uk', 'de', 'ru', 'cn', 'in', 'fr', 'jp', 'xyz', 'local', 'internal'}
+HOST_PATTERN = re.compile(r'^(?:[a-z0-9-]+\.)+([a-z]{2,})$', re.IGNORECASE)
+IPV4_PATTERN = re.compile(r'^\d{1,3}(?:\.\d{1,3}){3}$')
+
+SEGMENT_TYPES = [
+    ('{int}', re.compile(r'^\d+$')),
+    ('{uuid}', re.compile(r'^[0-9a-fA-F]{8}-[0-9a-fA-F]{4}-[0-9a-fA-F]{4}-[0-9a-fA-F]{4}-[0-9a-fA-F]{12}$')),
+    ('{hex}', re.compile(r'^[0-9a-fA-F]{16,}$')),
+]
+
+
+def looks_like_host(value):
+    if IPV4_PATTERN.match(value):
+        return True
+    match = HOST_PATTERN.match(value)
+    # 'inside_about.htm' is a file name, 'www.google.com' is a host
+    return bool(match) and (value.count('.') >= 2 or match.group(1).lower() in COMMON_TLDS)
+
+
+def char_classes(value):
+    """Bitmask of character classes and shapes in a decoded value"""
+    mask = 0
+    for c in value:
+        if c.isdigit() and c.isascii():
+            mask |= DIGIT
+        elif 'a' <= c <= 'z':
+            mask |= LOWER
+        elif 'A' <= c <= 'Z':
+            mask |= UPPER
+        elif c in PUNCT_BITS:
+            mask |= PUNCT_BITS[c]
+        else:
+            return mask | UNSAFE
+    if any(seq in value for seq in UNSAFE_SEQUENCES):
+        mask |= UNSAFE
+    if value.startswith('/'):
+        mask |= ABSOLUTE
+    # 'evil.com/x' and 'user@evil.com' carry a host just as 'evil.com' does
+    if any(looks_like_host(part) for part in re.split(r'[/@]', value)):
+        mask |= HOSTLIKE
+    return mask
+
+
+def segment_type(segment):
+    for name, pattern in SEGMENT_TYPES:
+        if pattern.match(segment):
+            return name
+    return None
+
+
+def split_request(path, body):
+    """Decoded path segments, query params and body params of a request
+
+    Returns None if the request cannot be parsed strictly.
+    """
+    parts = parse.urlsplit(str(path))
+    segments = [parse.unquote(s) for s in parts.path.split('/') if s]
+    try:
+        query = parse.parse_qsl(parts.query, keep_blank_values=True, strict_parsing=True) if parts.query else []
+        form = parse.parse_qsl(str(body), keep_blank_values=True, strict_parsing=True) if body else []
+    except ValueError:
+        return None
+    return segments, query, form
+
+
+class ParamProfile:
+    __slots__ = ('count', 'mask', 'min_len', 'max_len')
+
+    def __init__(self):
+        self.count = 0
+        self.mask = 0
+        self.min_len = None
+        self.max_len = 0
+
+    def learn(self, value):
+        self.count += 1
+        self.mask |= char_classes(value)
+        self.min_len = len(value) if self.min_len is None else min(self.min_len, len(value))
+        self.max_len = max(self.max_len, len(value))
+
+    @property
+    def eligible(self):
+        return self.count >= MIN_PARAM_SUPPORT and not self.mask & UNSAFE
+
+    def conforms(self, value):
+        if not self.eligible or not self.min_len <= len(value) <= self.max_len:
+            return False
+        mask = char_classes(value)
+        return not mask & ~self.mask
+
+    def describe(self):
+        classes = [name for bit, name in ((DIGIT, 'digit'), (LOWER, 'lower'), (UPPER, 'upper'))
+                   if self.mask & bit]
+        classes += [c for c, bit in PUNCT_BITS.items() if self.mask & bit]
+        classes += [name for bit, name in ((ABSOLUTE, 'absolute'), (HOSTLIKE, 'host')) if self.mask & bit]
+        if self.mask & UNSAFE:
+            classes.append('UNSAFE')
+        return f"[{','.join(classes)}] len {self.min_len}-{self.max_len} (n={self.count})"
+
+
+class RouteProfile:
+    __slots__ = ('count', 'query', 'form')
+
+    def __init__(self):
+        self.count = 0
+        self.query = {}
+        self.form = {}
+
+    def learn(self, query, form):
+        self.count += 1
+        for params, profiles in ((query, self.query), (form, self.form)):
+            for name, value in params:
+                profiles.setdefault(name, ParamProfile()).learn(value)
+
+    def conforms(self, query, form):
+        if self.count < MIN_ROUTE_SUPPORT:
+            return False
+        for params, profiles in ((query, self.query), (form, self.form)):
+            seen = set()
+            for name, value in params:
+                profile = profiles.get(name)
+                # Unknown or repeated parameters (parameter pollution) go deep
+                if profile is None or name in seen or not profile.conforms(value):
+                    return False
+                seen.add(name)
+        return True
+
+
+class _Node:
+    __slots__ = ('literals', 'typed', 'route')
+
+    def __init__(self):
+        self.literals = {}
+        self.typed = {}
+        self.route = None
+
+
+class RouteIndex:
+    """Path-segment trie of RouteProfiles learned from benign requests"""
+
+    def __init__(self):
+        self.root = _Node()
+        self.samples = 0
+
+    @classmethod
+    def build(cls, requests):
+        """Learn an index from an iterable of benign (path, body) pairs"""
+        index = cls()
+        for path, body in requests:
+            index.learn(path, body)
+        return index
+
+    def learn(self, path, body):
+        if flagged(path, body):
+            return
+        parsed = split_request(path, body)
+        if parsed is None:
+            return
+        segments, query, form = parsed
+        node = self.root
+        for segment in segments:
+            kind = segment_type(segment)
+            if kind:
+                node = node.typed.setdefault(kind, _Node())
+            else:
+                node = node.literals.setdefault(segment, _Node())
+        if node.route is None:
+            node.route = RouteProfile()
+        node.route.learn(query, form)
+        self.samples += 1
+
+    def _lookup(self, node, segments, i):
+        if i == len(segments):
+            return node.route
+        segment = segments[i]
+        child = node.literals.get(segment)
+        if child is not None:
+            route = self._lookup(child, segments, i + 1)
+            if route is not None:
+                return route
+        if node.typed:
+            kind = segment_type(segment)
+            child = node.typed.get(kind) if kind else None
+            if child is not None:
+                return self._lookup(child, segments, i + 1)
+        return None
+
+    def conforms(self, path, body):
+        """True if the request fully matches a learned route profile"""
+        if flagged(path, body):
+            return False
+        parsed = split_request(path, body)
+        if parsed is None:
+            return False
+        segments, query, form = parsed
+        if any(char_classes(segment) & UNSAFE for segment in segments):
+            return False
+        route = self._lookup(self.root, segments, 0)
+        return route is not None and route.conforms(query, form)
+
+    def routes(self):
+        """Yield (route pattern, RouteProfile) for every learned route"""
+        stack = [('', self.root)]
+        while stack:
+            prefix, node = stack.pop()
+            if node.route is not None:
+                yield prefix or '/', node.route
+            for name, child in node.literals.items():
+                stack.append((prefix + '/' + name, child))
+            for name, child in node.typed.items():
+                stack.append((prefix + '/' + name, child))
+
+    def __len__(self):
+        return sum(1 for _ in self.routes())
+
+
+def main():
+    from dataset_store import IMPORTERS, parse_source
+
+    parser = argparse.ArgumentParser(description="Learn and inspect the positive-security route index")
+    parser.add_argument('-s', '--source', type=parse_source, action='append', required=True,
+                        help="layout:csv[:label] as for dataset_store.py; only benign rows are learned")
+    parser.add_argument('--check', nargs='+', metavar='PATH', help="Report whether these paths conform")
+    args = parser.parse_args()
+
+    index = RouteIndex.build((path, body) for layout, csv_path, label in args.source
+                             for path, body, row_label in IMPORTERS[layout](csv_path, label)
+                             if row_label == 0)
+    print(f"[ROUTES] Learned {len(index)} routes from {index.samples} samples")
+
+    if args.check:
+        for path in args.check:
+            verdict = "conforms" if index.conforms(path, '') else "deep inspection"
+            print(f"  └─ {path}: {verdict}")
+        return
+
+    for pattern, route in sorted(index.routes(), key=lambda r: r[0]):
+        status = "" if route.count >= MIN_ROUTE_SUPPORT else " (insufficient support)"
+        print(f"{pattern} (n={route.count}){status}")
+        for name, profile in sorted(route.query.items()):
+            print(f"  └─ ?{name} {profile.describe()}")
+        for name, profile in sorted(route.form.items()):
+            print(f"  └─ body:{name} {profile.describe()}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,200 @@
+"""
+Self-Training Sample Store - Bounded, deduplicated corpus for retraining
+Requests are deduplicated by a hash of their normalized form; repeats only
+bump an occurrence count. Each class keeps at most ``capacity`` unique
+samples, chosen by weighted reservoir sampling that favours rare samples
+and samples the model scored close to the decision threshold.
+
+Each unique request gets a single admission draw, derived from a salted
+hash of its digest, so repeats never buy extra chances to get in. Evicted
+samples leave their count and key behind in a bounded ghost table; a
+request seen again keeps its full count and a key lowered to match it.
+
+Files are CSV without a header: path, body, count, key
+(path/body first so they stay readable as proxy payload CSVs)
+"""
+
+import csv
+import hashlib
+import math
+import heapq
+import os
+import re
+import sys
+import threading
+from collections import OrderedDict
+from urllib import parse
+
+csv.field_size_limit(sys.maxsize)
+
+# Reservoir weight for a sample right on the threshold vs. a confident one
+NEAR_THRESHOLD_BOOST = 4.0
+# Extra weight for a sample seen once; decays towards 1 as its count grows
+RARITY_BOOST = 2.0
+# Evicted counts remembered per reservoir, as a multiple of its capacity
+GHOST_FACTOR = 4
+
+
+def normalize_request(path, body):
+    """Canonical form used for deduplication: decoded, lowercased, single-spaced"""
+    text = parse.unquote_plus(str(path)) + '\n' + parse.unquote_plus(str(body))
+    return re.sub(r'\s+', ' ', text.lower()).strip()
+
+
+def request_hash(path, body):
+    return hashlib.blake2b(normalize_request(path, body).encode('utf-8', 'surrogateescape'),
+                           digest_size=16).hexdigest()
+
+
+def sample_weight_for(malicious_prob, count=1):
+    """Reservoir admission weight: near-threshold term times rarity term
+
+    near-threshold: 1 for confident verdicts, up to 1 + NEAR_THRESHOLD_BOOST at p = 0.5
+    rarity: rarity_factor(count)
+    """
+    threshold = 1.0
+    if malicious_prob is not None:
+        margin = min(1.0, abs(float(malicious_prob) - 0.5) * 2)
+        threshold += NEAR_THRESHOLD_BOOST * (1.0 - margin)
+    return threshold * rarity_factor(count)
+
+
+def rarity_factor(count):
+    """1 + RARITY_BOOST for a first sighting, tending to 1 for frequent requests"""
+    return 1.0 + RARITY_BOOST / (1.0 + math.log(max(1, count)))
+
+
+class _Reservoir:
+    """Fixed-size weighted reservoir (Efraimidis-Spirakis A-Res) of unique samples"""
+
+    def __init__(self, capacity):
+        self.capacity = capacity
+        self.entries = {}           # hash -> [path, body, count, key]
+        self.heap = []              # (key, hash), min key is evicted first
+        self.ghosts = OrderedDict() # hash -> (count, key) of evicted/rejected samples, LRU
+        # Secret per process, so clients cannot pick requests with high draws
+        self.salt = os.urandom(16)
+
+    def add(self, digest, path, body, malicious_prob):
+        entry = self.entries.get(digest)
+        if entry is not None:
+            entry[2] += 1
+            return True
+
+        ghost = self.ghosts.pop(digest, None)
+        if ghost is None:
+            # key = u ** (1 / w); larger weights tend to larger keys
+            key = self._draw(digest) ** (1.0 / sample_weight_for(malicious_prob, 1))
+            return self._insert(digest, [path, body, 1, key])
+
+        # Reuse the original draw u, rescaled to the lower rarity weight:
+        # (u ** (1 / (t * r_old))) ** (r_old / r_new) == u ** (1 / (t * r_new))
+        old_count, old_key = ghost
+        count = old_count + 1
+        key = old_key ** (rarity_factor(old_count) / rarity_factor(count))
+        return self._insert(digest, [path, body, count, key])
+
+    def _draw(self, digest):
+        """Uniform u in (0, 1], fixed per digest even once its ghost is forgotten"""
+        h = hashlib.blake2b(digest.encode(), key=self.salt, digest_size=8).digest()
+        return (int.from_bytes(h, 'big') + 1) / 2.0 ** 64
+
+    def _insert(self, digest, entry):
+        key = entry[3]
+        if len(self.entries) < self.capacity:
+            self.entries[digest] = entry
+            heapq.heappush(self.heap, (key, digest))
+            return True
+        if self.capacity <= 0 or key <= self.heap[0][0]:
+            self._remember(digest, entry)
+            return False
+        _, evicted = heapq.heapreplace(self.heap, (key, digest))
+        self._remember(evicted, self.entries.pop(evicted))
+        self.entries[digest] = entry
+        return True
+
+    def _remember(self, digest, entry):
+        self.ghosts[digest] = (entry[2], entry[3])
+        self.ghosts.move_to_end(digest)
+        while len(self.ghosts) > self.capacity * GHOST_FACTOR:
+            self.ghosts.popitem(last=False)
+
+
+class SampleStore:
+    """Per-class bounded reservoirs of deduplicated requests, persisted to CSV"""
+
+    def __init__(self, benign_path, malicious_path, capacity=5000):
+        self.paths = {0: benign_path, 1: malicious_path}
+        self.reservoirs = {0: _Reservoir(capacity), 1: _Reservoir(capacity)}
+        self.lock = threading.Lock()
+        self.dirty = False
+
+    def add(self, path, body, label, malicious_prob=None):
+        """Record one observed request; returns False if the reservoir rejected it"""
+        digest = request_hash(path, body)
+        with self.lock:
+            self.dirty = True
+            return self.reservoirs[label].add(digest, str(path), str(body), malicious_prob)
+
+    def samples(self):
+        """Snapshot of (path, body, label, count) for every stored sample"""
+        with self.lock:
+            return [(entry[0], entry[1], label, entry[2])
+                    for label, reservoir in self.reservoirs.items()
+                    for entry in reservoir.entries.values()]
+
+    def counts(self):
+        with self.lock:
+            return {label: len(reservoir.entries) for label, reservoir in self.reservoirs.items()}
+
+    def load(self):
+        """Load persisted samples; returns False if no store files exist yet"""
+        found = False
+        with self.lock:
+            for label, file_path in self.paths.items():
+                if not os.path.exists(file_path):
+                    continue
+                found = True
+                reservoir = self.reservoirs[label]
+                with open(file_path, 'r', newline='', encoding='utf-8') as f:
+                    for row in csv.reader(f):
+                        if len(row) < 4:
+                            continue
+                        path, body = row[0], row[1]
+                        digest = request_hash(path, body)
+                        if digest in reservoir.entries:
+                            reservoir.entries[digest][2] += int(row[2])
+                            continue
+                        reservoir._insert(digest, [path, body, int(row[2]), float(row[3])])
+        return found
+
+    def seed_from_csv(self, file_path, label):
+        """Import a legacy append-only payload CSV (path, body, ...)"""
+        if not os.path.exists(file_path):
+            return 0
+        imported = 0
+        with open(file_path, 'r', newline='', encoding='utf-8') as f:
+            for row in csv.reader(f):
+                if len(row) < 2:
+                    continue
+                self.add(row[0], row[1], label)
+                imported += 1
+        return imported
+
+    def save(self):
+        """Rewrite both store files if anything changed since the last save"""
+        with self.lock:
+            if not self.dirty:
+                return
+            snapshot = {label: [list(entry) for entry in reservoir.entries.values()]
+                        for label, reservoir in self.reservoirs.items()}
+            self.dirty = False
+
+        for label, entries in snapshot.items():
+            file_path = self.paths[label]
+            tmp_path = file_path + '.tmp'
+            with open(tmp_path, 'w', newline='', encoding='utf-8') as f:
+                writer = csv.writer(f)
+                for path, body, count, key in entries:
+                    writer.writerow([path, body, count, repr(key)])
+            os.replace(tmp_path, file_path)
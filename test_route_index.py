@@ -0,0 +1,100 @@
+import os
+import unittest
+
+from route_index import RouteIndex
+
+GOOD_REQ_CSV = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'Data_Collection', 'Good_req.csv')
+
+
+def learn(requests, repeat=3):
+    return RouteIndex.build([(path, body) for path, body in requests for _ in range(repeat)])
+
+
+class RouteIndexTest(unittest.TestCase):
+
+    def setUp(self):
+        self.index = learn([
+            ('/index.jsp?content=inside_about.htm', ''),
+            ('/index.jsp?content=pr%2f20061109.htm', ''),
+            ('/index.jsp?content=business_lending.htm', ''),
+            ('/search.jsp?query=876143', ''),
+            ('/search.jsp?query=12', ''),
+            ('/users/42/profile', ''),
+            ('/login', 'user=alice&token=ab12cd'),
+        ])
+
+    def test_learned_shapes_conform(self):
+        self.assertTrue(self.index.conforms('/index.jsp?content=inside_press.htm', ''))
+        self.assertTrue(self.index.conforms('/index.jsp?content=pr%2f20060817.htm', ''))
+        self.assertTrue(self.index.conforms('/search.jsp?query=1234', ''))
+        self.assertTrue(self.index.conforms('/users/7/profile', ''))
+        self.assertTrue(self.index.conforms('/login', 'user=carol&token=ff00ee'))
+
+    def test_absolute_path_value_does_not_conform(self):
+        self.assertFalse(self.index.conforms('/index.jsp?content=/etc/passwd', ''))
+        self.assertFalse(self.index.conforms('/index.jsp?content=/inside_about', ''))
+        self.assertFalse(self.index.conforms('/index.jsp?content=%2fetc%2fhosts', ''))
+
+    def test_badword_value_does_not_conform(self):
+        self.assertFalse(self.index.conforms('/index.jsp?content=admin/root.jsp', ''))
+        self.assertFalse(self.index.conforms('/search.jsp?query=select', ''))
+
+    def test_host_value_does_not_conform(self):
+        self.assertFalse(self.index.conforms('/index.jsp?content=www.google.com', ''))
+        self.assertFalse(self.index.conforms('/index.jsp?content=evil.com', ''))
+        self.assertFalse(self.index.conforms('/index.jsp?content=10.0.0.1', ''))
+        self.assertFalse(self.index.conforms('/index.jsp?content=evil.com%2Fx', ''))
+        self.assertFalse(self.index.conforms('/index.jsp?content=attacker.net%2Fpayload.htm', ''))
+        self.assertFalse(self.index.conforms('/index.jsp?content=www.google.com%2F', ''))
+        self.assertFalse(self.index.conforms('/index.jsp?content=pr%2fevil.com', ''))
+
+    def test_traversal_and_free_text_do_not_conform(self):
+        self.assertFalse(self.index.conforms('/index.jsp?content=../../etc/passwd', ''))
+        self.assertFalse(self.index.conforms("/index.jsp?content=x'or'1'='1", ''))
+        self.assertFalse(self.index.conforms('/search.jsp?query=<script>', ''))
+
+    def test_unknown_or_repeated_params_do_not_conform(self):
+        self.assertFalse(self.index.conforms('/index.jsp?evil=1', ''))
+        self.assertFalse(self.index.conforms('/index.jsp?content=a.htm&content=b.htm', ''))
+        self.assertFalse(self.index.conforms('/login', 'user=carol&token=ff00ee&role=x'))
+
+    def test_insufficient_support_does_not_conform(self):
+        index = learn([('/rare?id=abc', '')], repeat=1)
+        self.assertFalse(index.conforms('/rare?id=abc', ''))
+
+    def test_learned_shape_is_allowed(self):
+        index = learn([('/go?next=/home/start', ''), ('/go?next=/account/view', '')])
+        self.assertTrue(index.conforms('/go?next=/account/home', ''))
+
+    def test_flagged_samples_are_not_learned(self):
+        index = learn([('/files?name=passwd_backup', '')])
+        self.assertEqual(index.samples, 0)
+        self.assertFalse(index.conforms('/files?name=passwd_backup', ''))
+
+
+@unittest.skipUnless(os.path.exists(GOOD_REQ_CSV), "Data_Collection/Good_req.csv not present")
+class GoodReqRouteIndexTest(unittest.TestCase):
+    """The review cases against an index learned from the shipped benign corpus"""
+
+    @classmethod
+    def setUpClass(cls):
+        import csv
+        with open(GOOD_REQ_CSV, newline='', encoding='utf-8-sig') as f:
+            cls.index = RouteIndex.build((row['path'], row['body']) for row in csv.DictReader(f))
+
+    def test_known_good_conforms(self):
+        self.assertTrue(self.index.conforms('/index.jsp?content=inside_about.htm', ''))
+
+    def test_attack_values_do_not_conform(self):
+        for path in ('/index.jsp?content=/etc/passwd',
+                     '/index.jsp?content=admin/root.jsp',
+                     '/index.jsp?content=www.google.com',
+                     '/index.jsp?content=evil.com%2Fx',
+                     '/index.jsp?content=attacker.net%2Fpayload.htm',
+                     '/index.jsp?content=www.google.com%2F'):
+            with self.subTest(path=path):
+                self.assertFalse(self.index.conforms(path, ''))
+
+
+if __name__ == '__main__':
+    unittest.main()
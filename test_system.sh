@@ -64,8 +64,8 @@ cd ~/Documents/projects/Web_Application_Firewall
 files=(
     "Data_Collection/Good_req.csv"
     "Data_Collection/Bad_req.csv"
-    "benign_payloads.csv"
-    "malicious_payloads.csv"
+    "benign_samples.csv"
+    "malicious_samples.csv"
     "network_blocked.csv"
     "network_allowed.csv"
 )